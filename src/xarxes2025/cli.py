@@ -6,6 +6,7 @@ from loguru import logger
 
 
 from xarxes2025.server import Server
+from xarxes2025.supervisor import Supervisor
 from xarxes2025.client import Client
 
 
@@ -65,16 +66,49 @@ def cli(ctx, debug, debug_level, debug_file, debug_filename):
     show_default=True,
     type=int
 )
-def server(ctx, port):
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of server processes sharing the port",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1)
+)
+@click.option(
+    "-b",
+    "--backlog",
+    help="Pending connections queue size",
+    default=5,
+    show_default=True,
+    type=click.IntRange(min=1)
+)
+@click.option(
+    "-m",
+    "--media-dir",
+    help="Directory with the video files to serve",
+    default=".",
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False)
+)
+def server(ctx, port, workers, backlog, media_dir):
     """
     Start an RTSP server streaming video.
 
     \b
     The server will listen for incoming RTSP connections on the specified
-    port (default is 4321).
+    port (default is 4321). With more than one worker, the processes share
+    the port with SO_REUSEPORT and are restarted if they crash.
+    The video files of the media directory are cataloged at startup.
     """
     logger.info("Server xarxes 2025 video streaming")
-    server = Server(port)
+    if workers > 1:
+        try:
+            server = Supervisor(port, workers, backlog, media_dir)
+        except RuntimeError:
+            # Already logged by the supervisor
+            sys.exit(1)
+    else:
+        server = Server(port, backlog, media_dir=media_dir)
 
 
 @cli.command(name="client")
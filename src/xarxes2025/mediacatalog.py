@@ -0,0 +1,225 @@
+import os, threading
+from collections import OrderedDict
+import cv2
+from loguru import logger
+from xarxes2025.videoprocessor import VideoProcessor
+
+
+class MediaCatalog(object):
+
+    extensions = (".webm", ".mp4", ".avi", ".mkv", ".mov", ".mjpeg", ".mjpg")
+
+    def __init__(self, directory=".", pool_size=2, pool_limit=8, watch_interval=2.0):
+        """
+        Catalog of the video files available in a directory.
+
+        The metadata of each file is read once and cached. Captures given
+        back by clients are kept opened for the most recently requested
+        files, so a SETUP does not have to parse the container and
+        initialise the codec again.
+
+        :param directory: Directory containing the video files.
+        :param pool_size: Maximum number of opened captures kept per file.
+        :param pool_limit: Maximum number of opened captures kept in total.
+        :param watch_interval: Seconds between directory checks, 0 disables the watch.
+        """
+        self.directory = directory
+        self.pool_size = pool_size
+        self.pool_limit = pool_limit
+        self.watch_interval = watch_interval
+        self.entries = {}
+        # Pools of captures by file, the most recently requested last
+        self.pools = OrderedDict()
+        # Signature of the file each opened capture was opened from
+        self.signatures = {}
+        self.failed = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.scan()
+        logger.info(f"Media catalog loaded {len(self.entries)} files from {self.directory}")
+        if self.watch_interval:
+            threading.Thread(target=self.watch, daemon=True).start()
+
+    def watch(self):
+        """Rescan the directory periodically until stop() is called."""
+        while not self.stop_event.wait(self.watch_interval):
+            self.scan()
+
+    def stop(self):
+        """Stop the directory watch and release all the pooled captures."""
+        self.stop_event.set()
+        with self.lock:
+            pools, self.pools = self.pools, OrderedDict()
+        for pool in pools.values():
+            for video in pool:
+                self.close(video)
+
+    def scan(self):
+        """
+        Update the catalog with the files of the directory.
+
+        Only new or modified files (by modification time and size) are probed
+        again; removed files are dropped with their pooled captures.
+        """
+        signatures = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(self.extensions):
+                        stat = entry.stat()
+                        signatures[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            logger.error(f"Cannot scan media directory {self.directory}: {e}")
+            return
+
+        for name in set(self.entries) - set(signatures):
+            logger.info(f"Media {name} removed from catalog")
+            self.drop(name)
+        for name in set(self.failed) - set(signatures):
+            self.failed.pop(name)
+
+        for name, signature in signatures.items():
+            entry = self.entries.get(name)
+            if entry and entry["signature"] == signature:
+                continue
+            if self.failed.get(name) == signature:
+                continue
+            metadata = self.probe(name, signature)
+            self.drop(name)
+            if metadata is None:
+                self.failed[name] = signature
+                continue
+            self.failed.pop(name, None)
+            with self.lock:
+                self.entries[name] = metadata
+            logger.info(f"Media {name} cataloged: {metadata['width']}x{metadata['height']}, "
+                        f"{metadata['fps']:.2f} fps, {metadata['frames']} frames")
+
+    def probe(self, name, signature):
+        """
+        Read the metadata of a video file.
+
+        :returns: A dict with fps, frames, duration, width, height and
+                signature, or None if the file cannot be opened.
+        """
+        cap = cv2.VideoCapture(self.path(name))
+        try:
+            if not cap.isOpened():
+                logger.error(f"Cannot open {name} file")
+                return None
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            return {
+                "fps": fps,
+                "frames": frames,
+                "duration": frames / fps if fps else 0.0,
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "signature": signature,
+            }
+        finally:
+            cap.release()
+
+    def drop(self, name):
+        """Remove a file from the catalog and close its pooled captures."""
+        with self.lock:
+            self.entries.pop(name, None)
+            pool = self.pools.pop(name, [])
+        for video in pool:
+            self.close(video)
+
+    def close(self, video):
+        """Close a capture opened by the catalog."""
+        self.signatures.pop(video, None)
+        video.close()
+
+    def path(self, name):
+        """Return the path of a file of the catalog."""
+        return os.path.join(self.directory, name)
+
+    def lookup(self, name):
+        """Return the cached metadata of a file, or None if it is not in the catalog."""
+        return self.entries.get(name)
+
+    def acquire(self, name):
+        """
+        Get a capture of a file ready to stream from the first frame.
+
+        A pooled capture is used if available, otherwise a new one is opened.
+
+        :raises KeyError: If the file is not in the catalog.
+        :raises IOError: If the file cannot be opened.
+        """
+        with self.lock:
+            entry = self.entries[name]
+            pool = self.pools.get(name)
+            if pool is not None:
+                self.pools.move_to_end(name)
+                if pool:
+                    return pool.pop()
+        video = VideoProcessor(self.path(name))
+        self.signatures[video] = entry["signature"]
+        return video
+
+    def release(self, name, video):
+        """
+        Give back a capture obtained with acquire().
+
+        It is rewound and pooled, unless the pool is full, the file changed
+        since the capture was opened or the capture cannot be rewound. The
+        least recently requested files lose their captures when there are
+        more than pool_limit in total.
+        """
+        entry = self.entries.get(name)
+        if self.stop_event.is_set() or not entry or entry["signature"] != self.signatures.get(video):
+            self.close(video)
+            return
+        if not video.rewind():
+            logger.error(f"Cannot rewind {name}, closing capture")
+            self.close(video)
+            return
+        evicted = []
+        with self.lock:
+            entry = self.entries.get(name)
+            if (entry and entry["signature"] == self.signatures.get(video)
+                    and len(self.pools.get(name, [])) < self.pool_size):
+                self.pools.setdefault(name, []).append(video)
+                self.pools.move_to_end(name)
+            else:
+                evicted.append(video)
+            while sum(len(p) for p in self.pools.values()) > self.pool_limit:
+                oldest = next(n for n, p in self.pools.items() if p)
+                evicted.append(self.pools[oldest].pop(0))
+        for video in evicted:
+            self.close(video)
+
+    def pooled(self, name=None):
+        """Return the number of pooled captures of a file, or of all files."""
+        with self.lock:
+            if name is not None:
+                return len(self.pools.get(name, []))
+            return sum(len(p) for p in self.pools.values())
+
+    def describe(self, name, host="127.0.0.1"):
+        """
+        Build the SDP description of a file from the cached metadata.
+
+        :returns: The SDP text, or None if the file is not in the catalog.
+        """
+        entry = self.lookup(name)
+        if entry is None:
+            return None
+        lines = [
+            "v=0",
+            f"o=- {entry['signature'][0]} 1 IN IP4 {host}",
+            f"s={name}",
+            f"c=IN IP4 {host}",
+            "t=0 0",
+            f"a=range:npt=0-{entry['duration']:.3f}",
+            "m=video 0 RTP/AVP 26",
+            "a=rtpmap:26 JPEG/90000",
+            f"a=framerate:{entry['fps']:.2f}",
+            f"a=x-dimensions:{entry['width']},{entry['height']}",
+            f"a=x-framecount:{entry['frames']}",
+        ]
+        return "\r\n".join(lines) + "\r\n"
@@ -1,39 +1,69 @@
 import socket, threading, random, time, os
 from loguru import logger
 from xarxes2025.udpdatagram import UDPDatagram
-from xarxes2025.videoprocessor import VideoProcessor
+from xarxes2025.mediacatalog import MediaCatalog
+from xarxes2025.sessionregistry import SessionRegistry
 
 class Server(object):
-    def __init__(self, port):
+
+    session_check_interval = 1.0
+
+    def __init__(self, port, backlog=5, sessions=None, reuse_port=False, media_dir="."):
         """
         Initialize a new VideoStreaming server.
 
         :param port: The port to listen on.
+        :param backlog: Maximum number of pending connections in the accept queue.
+        :param sessions: SessionRegistry of the server. When running several
+                workers it is shared, so any worker can answer for a session
+                created by another one.
+        :param reuse_port: Set SO_REUSEPORT so several workers can bind the same port.
+        :param media_dir: Directory with the video files to serve.
         """
         self.video = None
         self.port = port
+        self.backlog = backlog
+        self.sessions = sessions if sessions is not None else SessionRegistry()
+        # Teardown events of the sessions owned by this process' connections
+        self.owned = {}
+        self.catalog = MediaCatalog(media_dir)
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if reuse_port:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.server_socket.bind(("127.0.0.1", self.port))
-        self.server_socket.listen(5)  # Allow 5 concurrent client
+        self.server_socket.listen(self.backlog)
         logger.info(f"Server RTSP created listening port {self.port}")
+        threading.Thread(target=self.watch_sessions, daemon=True).start()
         self.start()
 
     def start(self):
         """Listens for incoming connections and creates a thread for each client"""
-        while True:
-            client_socket, client_address = self.server_socket.accept()
-            logger.info(f"Online client from {client_address}")
-            client_thread = threading.Thread(target=self.handle_client, args=(client_socket, client_address))
-            client_thread.start()
+        try:
+            while True:
+                client_socket, client_address = self.server_socket.accept()
+                logger.info(f"Online client from {client_address}")
+                client_thread = threading.Thread(target=self.handle_client, args=(client_socket, client_address))
+                client_thread.start()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop accepting clients and release the media catalog."""
+        self.server_socket.close()
+        self.catalog.stop()
+        logger.info("Server RTSP stopped")
 
     def handle_client(self, client_socket, client_address):
         state = "INIT"
         session_id = None
         cseq = 0
+        request_session = None
         client_rtp_port = None
         client_ip = client_address[0]
         video = None
+        media_name = None
         play_event = threading.Event()
+        torn_down = threading.Event()
         play_thread = None
 
         while True:
@@ -50,8 +80,11 @@ class Server(object):
 
                 logger.info(f"Received from client:\n{request}")
                 cseq = None
+                request_session = None
                 request_lines = request.split("\n")
                 for line in request_lines:
+                    if line.startswith("Session:"):
+                        request_session = line.split(":")[1].strip()
                     if line.startswith("CSeq:"):
                         try:
                             cseq = int(line.split(":")[1].strip())
@@ -67,15 +100,29 @@ class Server(object):
                     continue
                 command = request_lines[0].split()[0]
 
+                if session_id is not None and torn_down.is_set():
+                    # Torn down from another connection, maybe on another worker
+                    logger.info(f"Session {session_id} was torn down, resetting connection")
+                    play_event.clear()
+                    if play_thread:
+                        play_thread.join()
+                        play_thread = None
+                    if video:
+                        self.catalog.release(media_name, video)
+                        video = None
+                    self.owned.pop(session_id, None)
+                    session_id = None
+                    state = "INIT"
+
                 if command == "SETUP" and state == "INIT":
                     media_name = os.path.basename(request_lines[0].split()[1])
-                    if not os.path.exists(media_name):
+                    if self.catalog.lookup(media_name) is None:
                         response = f"RTSP/1.0 404 Not Found\r\nCSeq: {cseq}\r\n\r\n"
                         client_socket.send(response.encode())
                         continue
 
                     try:
-                        video = VideoProcessor(media_name)
+                        video = self.catalog.acquire(media_name)
                     except Exception as e:
                         logger.error(f"Couldn't open video: {e}")
                         response = f"RTSP/1.0 500 Internal Server Error\r\nCSeq: {cseq}\r\n\r\n"
@@ -84,6 +131,8 @@ class Server(object):
 
                     transport = next((l for l in request_lines if l.startswith("Transport:")), None)
                     if not transport:
+                        self.catalog.release(media_name, video)
+                        video = None
                         response = f"RTSP/1.0 400 Bad Request\r\nCSeq: {cseq}\r\n\r\n"
                         client_socket.send(response.encode())
                         continue
@@ -100,6 +149,8 @@ class Server(object):
                                 continue
                     if client_rtp_port is None:
                         logger.error("client_port not found")
+                        self.catalog.release(media_name, video)
+                        video = None
                         response = f"RTSP/1.0 400 Bad Request\r\nCSeq: {cseq}\r\n\r\n"
                         client_socket.send(response.encode())
                         continue
@@ -112,9 +163,17 @@ class Server(object):
                         f"Transport: RTP/UDP; client_port={client_rtp_port}\r\n\r\n"
                     )
                     state = "READY"
+                    torn_down = threading.Event()
+                    self.sessions.register(session_id, state, media_name)
+                    self.owned[session_id] = torn_down
                     client_socket.send(response.encode())
 
                 elif command == "PLAY" and state == "READY":
+                    if not self.sessions.update(session_id, "PLAYING"):
+                        torn_down.set()
+                        response = f"RTSP/1.0 454 Session Not Found\r\nCSeq: {cseq}\r\n\r\n"
+                        client_socket.send(response.encode())
+                        continue
                     state = "PLAYING"
                     play_event.set()
                     response = f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nSession: {session_id}\r\n\r\n"
@@ -122,23 +181,70 @@ class Server(object):
 
                     play_thread = threading.Thread(
                         target=self.send_udp_frame,
-                        args=(video, client_ip, client_rtp_port, play_event),
+                        args=(video, client_ip, client_rtp_port, play_event, torn_down),
                         daemon=True
                     )
                     play_thread.start()
 
                 elif command == "PAUSE" and state == "PLAYING":
                     play_event.clear()
+                    if not self.sessions.update(session_id, "READY"):
+                        torn_down.set()
+                        response = f"RTSP/1.0 454 Session Not Found\r\nCSeq: {cseq}\r\n\r\n"
+                        client_socket.send(response.encode())
+                        continue
                     state = "READY"
                     response = f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nSession: {session_id}\r\n\r\n"
                     client_socket.send(response.encode())
 
                 elif command == "TEARDOWN":
+                    # The session may belong to a connection handled by another worker
+                    target = session_id or request_session
+                    if not self.end_session(target) and session_id is None:
+                        response = f"RTSP/1.0 454 Session Not Found\r\nCSeq: {cseq}\r\n\r\n"
+                        client_socket.send(response.encode())
+                        continue
                     state = "INIT"
                     play_event.clear()
                     if play_thread and play_thread.is_alive():
                         play_thread.join()
-                    response = f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nSession: {session_id}\r\n\r\n"
+                    if video:
+                        self.catalog.release(media_name, video)
+                        video = None
+                    if session_id is not None:
+                        self.owned.pop(session_id, None)
+                        session_id = None
+                    response = f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nSession: {target}\r\n\r\n"
+                    client_socket.send(response.encode())
+
+                elif command == "GET_PARAMETER":
+                    target = request_session or session_id
+                    if target not in self.sessions:
+                        response = f"RTSP/1.0 454 Session Not Found\r\nCSeq: {cseq}\r\n\r\n"
+                        client_socket.send(response.encode())
+                        continue
+                    response = f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nSession: {target}\r\n\r\n"
+                    client_socket.send(response.encode())
+
+                elif command == "DESCRIBE":
+                    url = request_lines[0].split()[1]
+                    sdp = self.catalog.describe(os.path.basename(url))
+                    if sdp is None:
+                        response = f"RTSP/1.0 404 Not Found\r\nCSeq: {cseq}\r\n\r\n"
+                        client_socket.send(response.encode())
+                        continue
+                    response = (
+                        f"RTSP/1.0 200 OK\r\n"
+                        f"CSeq: {cseq}\r\n"
+                        f"Content-Base: {url}/\r\n"
+                        f"Content-Type: application/sdp\r\n"
+                        f"Content-Length: {len(sdp.encode())}\r\n\r\n"
+                        f"{sdp}"
+                    )
+                    client_socket.send(response.encode())
+
+                elif command in ("PLAY", "PAUSE") and request_session and request_session not in self.sessions:
+                    response = f"RTSP/1.0 454 Session Not Found\r\nCSeq: {cseq}\r\n\r\n"
                     client_socket.send(response.encode())
 
                 elif command == "QUIT":
@@ -155,13 +261,60 @@ class Server(object):
         play_event.clear()
         if play_thread:
             play_thread.join()
+        if session_id is not None:
+            self.owned.pop(session_id, None)
+            try:
+                self.sessions.remove(session_id)
+            except Exception as e:
+                logger.error(f"Cannot remove session {session_id}: {e}")
+        if video:
+            self.catalog.release(media_name, video)
         client_socket.close()
         logger.info("Offline client")
 
-    def send_udp_frame(self, video, client_ip, client_rtp_port, play_event):
+    def end_session(self, session_id):
+        """
+        Remove a session from the registry and notify its connection if it
+        is handled by this process. Connections on other workers notice it
+        in watch_sessions().
+
+        :returns: False if the session was not registered.
+        """
+        removed = self.sessions.remove(session_id)
+        torn_down = self.owned.get(session_id)
+        if torn_down:
+            torn_down.set()
+        return removed
+
+    def watch_sessions(self):
+        """
+        Periodically check that the sessions owned by this process are still
+        registered, and stop the ones torn down from another worker.
+
+        Checking here, instead of in the play loop, costs a single registry
+        access per interval whatever the number of streams.
+        """
+        while True:
+            time.sleep(self.session_check_interval)
+            # Sessions are registered before being owned, so taking this
+            # snapshot first never sees a session missing from the registry
+            owned = list(self.owned.items())
+            if not owned:
+                continue
+            try:
+                registered = self.sessions.ids()
+            except Exception as e:
+                logger.error(f"Cannot check session registry: {e}")
+                continue
+            for session_id, torn_down in owned:
+                if session_id not in registered:
+                    torn_down.set()
+
+    def send_udp_frame(self, video, client_ip, client_rtp_port, play_event, torn_down):
+        sock = None
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            while play_event.is_set():
+            while play_event.is_set() and not torn_down.is_set():
                 data = video.next_frame()
                 if not data:
                     logger.info(f"End of video stream")
@@ -172,4 +325,5 @@ class Server(object):
         except Exception as e:
             logger.error(f"UDP Error: {e}")
         finally:
-            sock.close()
\ No newline at end of file
+            if sock:
+                sock.close()
\ No newline at end of file
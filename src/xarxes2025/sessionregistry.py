@@ -0,0 +1,75 @@
+import os, threading
+
+
+class SessionRegistry(object):
+
+    def __init__(self, sessions=None, lock=None):
+        """
+        Registry of the RTSP sessions of the server.
+
+        With several workers the dict and the lock come from a
+        multiprocessing.Manager, so every worker sees the same sessions.
+        Each check-and-write is done under the lock, as another worker may
+        remove the session at the same time.
+
+        :param sessions: Dict-like object holding the sessions.
+        :param lock: Lock protecting the sessions.
+        """
+        self.sessions = sessions if sessions is not None else {}
+        self.lock = lock if lock is not None else threading.Lock()
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def register(self, session_id, state, media_name):
+        """Add a new session owned by the current process."""
+        with self.lock:
+            self.sessions[session_id] = {"state": state, "pid": os.getpid(), "media": media_name}
+
+    def update(self, session_id, state):
+        """
+        Change the state of a registered session.
+
+        The whole entry is reassigned, as changes inside a value of a shared
+        dict are not propagated to the other workers.
+
+        :returns: False if the session is not registered (it was torn down).
+        """
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return False
+            entry = dict(entry)
+            entry["state"] = state
+            self.sessions[session_id] = entry
+            return True
+
+    def remove(self, session_id):
+        """
+        Remove a session from the registry.
+
+        :returns: False if the session was not registered.
+        """
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def state(self, session_id):
+        """Return the state of a session, or None if it is not registered."""
+        entry = self.sessions.get(session_id)
+        return entry["state"] if entry else None
+
+    def ids(self):
+        """Return the set of registered session ids."""
+        return set(self.sessions.keys())
+
+    def purge(self, pid):
+        """
+        Remove the sessions owned by a process, used when a worker dies.
+
+        :returns: The number of sessions removed.
+        """
+        with self.lock:
+            dead = [session_id for session_id, entry in self.sessions.items() if entry.get("pid") == pid]
+            for session_id in dead:
+                self.sessions.pop(session_id, None)
+        return len(dead)
@@ -0,0 +1,149 @@
+import multiprocessing, signal, socket, sys, time
+from loguru import logger
+from xarxes2025.server import Server
+from xarxes2025.sessionregistry import SessionRegistry
+
+
+def run_worker(port, backlog, sessions, media_dir):
+    """Entry point of a worker process: a Server sharing the port with the other workers."""
+    Server(port, backlog=backlog, sessions=sessions, reuse_port=True, media_dir=media_dir)
+
+
+class RestartPolicy(object):
+
+    def __init__(self, max_restarts=5, window=60.0, backoff=1.0, max_backoff=30.0):
+        """
+        Restart policy of a worker: exponential backoff and a limit of
+        restarts within a time window.
+
+        :param max_restarts: Maximum restarts allowed within the window.
+        :param window: Length of the window in seconds.
+        :param backoff: Delay before the first restart in seconds, doubled on each restart.
+        :param max_backoff: Maximum delay before a restart in seconds.
+        """
+        self.max_restarts = max_restarts
+        self.window = window
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.restarts = []
+
+    def record(self, now):
+        """
+        Record an exit of the worker.
+
+        :param now: Current time, from time.monotonic().
+        :returns: Seconds to wait before restarting the worker, or None if
+                it exited too many times and must not be restarted.
+        """
+        self.restarts = [t for t in self.restarts if now - t < self.window]
+        if len(self.restarts) >= self.max_restarts:
+            return None
+        self.restarts.append(now)
+        return min(self.backoff * 2 ** (len(self.restarts) - 1), self.max_backoff)
+
+
+class Supervisor(object):
+
+    check_interval = 0.5
+
+    def __init__(self, port, workers, backlog=5, media_dir="."):
+        """
+        Pre-fork several Server workers listening on the same RTSP port.
+
+        The kernel balances incoming connections between the workers thanks
+        to SO_REUSEPORT. Sessions are kept in a registry shared between all
+        of them, and workers that die are started again following a
+        RestartPolicy.
+
+        :param port: The port to listen on.
+        :param workers: Number of worker processes.
+        :param backlog: Maximum number of pending connections per worker.
+        :param media_dir: Directory with the video files to serve.
+        :raises RuntimeError: If a worker keeps exiting or the registry is lost.
+        """
+        if not hasattr(socket, "SO_REUSEPORT"):
+            logger.error("SO_REUSEPORT is not supported on this platform")
+            raise OSError("SO_REUSEPORT not supported")
+        self.port = port
+        self.workers = workers
+        self.backlog = backlog
+        self.media_dir = media_dir
+        # fork keeps the logger configuration in the workers
+        self.context = multiprocessing.get_context("fork")
+        self.manager = self.context.Manager()
+        self.sessions = SessionRegistry(self.manager.dict(), self.manager.Lock())
+        self.processes = {}
+        self.policies = {index: RestartPolicy() for index in range(self.workers)}
+        logger.info(f"Supervisor starting {self.workers} workers on port {self.port}")
+        # Go through stop() when terminated; the workers inherit the handler
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self.start()
+
+    def spawn(self, index):
+        """Start the worker number index."""
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.port, self.backlog, self.sessions, self.media_dir),
+            name=f"xarxes2025-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Worker {index} started with pid {process.pid}")
+
+    def start(self):
+        """Start all the workers and restart the ones that exit."""
+        pending = {}
+        for index in range(self.workers):
+            self.spawn(index)
+        try:
+            while True:
+                time.sleep(self.check_interval)
+                self.check_registry()
+                now = time.monotonic()
+                for index, process in list(self.processes.items()):
+                    if index in pending or process.is_alive():
+                        continue
+                    self.sessions.purge(process.pid)
+                    delay = self.policies[index].record(now)
+                    if delay is None:
+                        logger.error(f"Worker {index} exited {self.policies[index].max_restarts} times "
+                                     f"in {self.policies[index].window:.0f}s, giving up")
+                        raise RuntimeError(f"Worker {index} keeps exiting")
+                    logger.warning(f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, "
+                                   f"restarting in {delay:.1f}s")
+                    pending[index] = now + delay
+                for index, when in list(pending.items()):
+                    if when <= now:
+                        del pending[index]
+                        self.spawn(index)
+        except KeyboardInterrupt:
+            logger.info("Supervisor interrupted")
+        finally:
+            self.stop()
+
+    def check_registry(self):
+        """
+        Check that the Manager process holding the session registry is alive.
+
+        The workers keep proxies to it, so it cannot be replaced: if it is
+        gone the whole server is stopped.
+        """
+        try:
+            self.sessions.ids()
+        except Exception as e:
+            logger.error(f"Session registry is not reachable: {e}")
+            raise RuntimeError("Session registry lost") from e
+
+    def stop(self):
+        """Terminate all the workers and the shared registry."""
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join()
+        try:
+            self.manager.shutdown()
+        except Exception as e:
+            logger.error(f"Cannot shut down session registry: {e}")
+        logger.info("Supervisor stopped")
@@ -63,3 +63,23 @@ class VideoProcessor(object):
 
         return self.frame_num
 
+    def rewind(self):
+        """
+        Go back to the first frame so the capture can be reused by another client.
+
+        :returns: True if the capture is on the first frame, False if the
+                seek failed and the capture should not be reused.
+        """
+        if not self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+            return False
+        if self.cap.get(cv2.CAP_PROP_POS_FRAMES) != 0:
+            return False
+        self.frame_num = 0
+        return True
+
+    def close(self):
+        """Release the underlying video capture."""
+
+        self.cap.release()
+        self.ready = False
+
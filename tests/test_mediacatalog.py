@@ -0,0 +1,119 @@
+import os, tempfile, unittest
+import cv2
+import numpy as np
+from xarxes2025.mediacatalog import MediaCatalog
+
+
+def write_video(path, frames, fps=25, size=(64, 48)):
+    """Write a small MJPEG video with the given number of frames."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i % 255, np.uint8))
+    writer.release()
+
+
+class MediaCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        write_video(os.path.join(self.directory, "a.avi"), 50)
+        write_video(os.path.join(self.directory, "b.avi"), 25)
+        with open(os.path.join(self.directory, "notes.txt"), "w") as f:
+            f.write("not a video")
+        self.catalog = MediaCatalog(self.directory, pool_size=2, pool_limit=3, watch_interval=0)
+
+    def tearDown(self):
+        self.catalog.stop()
+        self.tmp.cleanup()
+
+    def test_scan_caches_metadata(self):
+        self.assertEqual(set(self.catalog.entries), {"a.avi", "b.avi"})
+        entry = self.catalog.lookup("a.avi")
+        self.assertEqual(entry["frames"], 50)
+        self.assertEqual(entry["fps"], 25)
+        self.assertEqual((entry["width"], entry["height"]), (64, 48))
+        self.assertAlmostEqual(entry["duration"], 2.0)
+        self.assertIsNone(self.catalog.lookup("notes.txt"))
+
+    def test_no_capture_opened_at_scan(self):
+        self.assertEqual(self.catalog.pooled(), 0)
+
+    def test_release_rewinds_and_pools(self):
+        video = self.catalog.acquire("a.avi")
+        for _ in range(10):
+            video.next_frame()
+        self.catalog.release("a.avi", video)
+        self.assertEqual(self.catalog.pooled("a.avi"), 1)
+        again = self.catalog.acquire("a.avi")
+        self.assertIs(again, video)
+        self.assertEqual(again.get_frame_number(), 0)
+        self.assertEqual(again.cap.get(cv2.CAP_PROP_POS_FRAMES), 0)
+        self.assertIsNotNone(again.next_frame())
+
+    def test_capture_that_cannot_rewind_is_closed(self):
+        video = self.catalog.acquire("a.avi")
+        video.rewind = lambda: False
+        self.catalog.release("a.avi", video)
+        self.assertEqual(self.catalog.pooled("a.avi"), 0)
+        self.assertFalse(video.ready)
+
+    def test_pool_size_per_file(self):
+        videos = [self.catalog.acquire("a.avi") for _ in range(3)]
+        for video in videos:
+            self.catalog.release("a.avi", video)
+        self.assertEqual(self.catalog.pooled("a.avi"), 2)
+        self.assertFalse(videos[2].ready)
+
+    def test_pool_limit_evicts_least_recently_requested(self):
+        a = [self.catalog.acquire("a.avi") for _ in range(2)]
+        b = [self.catalog.acquire("b.avi") for _ in range(2)]
+        for video in a:
+            self.catalog.release("a.avi", video)
+        for video in b:
+            self.catalog.release("b.avi", video)
+        self.assertEqual(self.catalog.pooled(), 3)
+        self.assertEqual(self.catalog.pooled("a.avi"), 1)
+        self.assertEqual(self.catalog.pooled("b.avi"), 2)
+
+    def test_changed_file_drops_pool_and_stale_capture(self):
+        pooled = self.catalog.acquire("a.avi")
+        loaned = self.catalog.acquire("a.avi")
+        self.catalog.release("a.avi", pooled)
+        write_video(os.path.join(self.directory, "a.avi"), 75)
+        self.catalog.scan()
+        self.assertEqual(self.catalog.lookup("a.avi")["frames"], 75)
+        self.assertFalse(pooled.ready)
+        self.catalog.release("a.avi", loaned)
+        self.assertFalse(loaned.ready)
+        self.assertEqual(self.catalog.pooled("a.avi"), 0)
+
+    def test_removed_file_is_dropped(self):
+        video = self.catalog.acquire("b.avi")
+        self.catalog.release("b.avi", video)
+        os.remove(os.path.join(self.directory, "b.avi"))
+        self.catalog.scan()
+        self.assertIsNone(self.catalog.lookup("b.avi"))
+        self.assertEqual(self.catalog.pooled("b.avi"), 0)
+        self.assertFalse(video.ready)
+        with self.assertRaises(KeyError):
+            self.catalog.acquire("b.avi")
+
+    def test_stop_closes_pooled_captures(self):
+        video = self.catalog.acquire("a.avi")
+        self.catalog.release("a.avi", video)
+        self.catalog.stop()
+        self.assertEqual(self.catalog.pooled(), 0)
+        self.assertFalse(video.ready)
+        self.assertEqual(self.catalog.signatures, {})
+
+    def test_describe(self):
+        sdp = self.catalog.describe("a.avi")
+        self.assertIn("s=a.avi\r\n", sdp)
+        self.assertIn("a=range:npt=0-2.000\r\n", sdp)
+        self.assertIn("a=x-dimensions:64,48\r\n", sdp)
+        self.assertIsNone(self.catalog.describe("missing.avi"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import multiprocessing, os, unittest
+from xarxes2025.sessionregistry import SessionRegistry
+
+
+class SessionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = SessionRegistry()
+
+    def test_register_and_update(self):
+        self.registry.register("0000000001", "READY", "rick.webm")
+        self.assertTrue(self.registry.update("0000000001", "PLAYING"))
+        self.assertEqual(self.registry.state("0000000001"), "PLAYING")
+        self.assertEqual(self.registry.sessions["0000000001"]["media"], "rick.webm")
+        self.assertEqual(self.registry.sessions["0000000001"]["pid"], os.getpid())
+
+    def test_update_does_not_recreate_removed_session(self):
+        self.registry.register("0000000001", "PLAYING", "rick.webm")
+        self.assertTrue(self.registry.remove("0000000001"))
+        self.assertFalse(self.registry.update("0000000001", "READY"))
+        self.assertNotIn("0000000001", self.registry)
+        self.assertIsNone(self.registry.state("0000000001"))
+
+    def test_remove_unknown_session(self):
+        self.assertFalse(self.registry.remove("0000000001"))
+
+    def test_purge_only_removes_sessions_of_pid(self):
+        self.registry.sessions["0000000001"] = {"state": "READY", "pid": 1, "media": "a.webm"}
+        self.registry.sessions["0000000002"] = {"state": "PLAYING", "pid": 2, "media": "a.webm"}
+        self.registry.sessions["0000000003"] = {"state": "READY", "pid": 1, "media": "b.webm"}
+        self.assertEqual(self.registry.purge(1), 2)
+        self.assertEqual(self.registry.ids(), {"0000000002"})
+
+    def test_shared_registry(self):
+        manager = multiprocessing.get_context("fork").Manager()
+        try:
+            registry = SessionRegistry(manager.dict(), manager.Lock())
+            registry.register("0000000001", "READY", "rick.webm")
+            self.assertTrue(registry.update("0000000001", "PLAYING"))
+            self.assertEqual(registry.state("0000000001"), "PLAYING")
+            self.assertTrue(registry.remove("0000000001"))
+            self.assertFalse(registry.update("0000000001", "READY"))
+            self.assertEqual(registry.ids(), set())
+        finally:
+            manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from xarxes2025.supervisor import RestartPolicy
+
+
+class RestartPolicyTest(unittest.TestCase):
+
+    def test_exponential_backoff(self):
+        policy = RestartPolicy(max_restarts=10, window=60.0, backoff=1.0, max_backoff=8.0)
+        delays = [policy.record(float(now)) for now in range(5)]
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 8.0, 8.0])
+
+    def test_gives_up_after_max_restarts_in_window(self):
+        policy = RestartPolicy(max_restarts=3, window=60.0)
+        for now in range(3):
+            self.assertIsNotNone(policy.record(float(now)))
+        self.assertIsNone(policy.record(10.0))
+
+    def test_old_restarts_leave_the_window(self):
+        policy = RestartPolicy(max_restarts=2, window=10.0, backoff=1.0)
+        policy.record(0.0)
+        policy.record(1.0)
+        self.assertIsNone(policy.record(5.0))
+        self.assertEqual(policy.record(20.0), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()